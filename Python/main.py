@@ -13,8 +13,12 @@ load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
 GUILD_ID = os.getenv("GUILD_ID")
 STAFF_ROLE_ID = os.getenv("STAFF_ROLE_ID")
+_STAFF_ROLE_ID = int(STAFF_ROLE_ID) if STAFF_ROLE_ID else None
 TICKET_CATEGORY_NAME = os.getenv("TICKET_CATEGORY", "Tickets")
 
+# Discord returns at most 100 messages per history request
+HISTORY_PAGE_SIZE = 100
+
 # Preset selections (UI is English)
 PRESET_REASONS = [
     "Billing / Payment",
@@ -31,53 +35,193 @@ PRESET_PRIORITIES = [
     "Urgent",
 ]
 
+_PROMPT_PREFIX = "Please choose a reason and a priority, then press **Create Ticket**.\n\n"
+_UNSET_LABEL = "—"
+
+# Built once; Select gets a shallow copy since it owns its options list
+_REASON_OPTIONS = [discord.SelectOption(label=r) for r in PRESET_REASONS]
+_PRIORITY_OPTIONS = [discord.SelectOption(label=p) for p in PRESET_PRIORITIES]
+
+# Shared permission templates (treated as read-only)
+_DENY_VIEW = discord.PermissionOverwrite(view_channel=False)
+_OPENER_OW = discord.PermissionOverwrite(
+    view_channel=True, send_messages=True, read_message_history=True, attach_files=True
+)
+_BOT_OW = discord.PermissionOverwrite(
+    view_channel=True, send_messages=True, manage_channels=True, read_message_history=True, attach_files=True
+)
+_STAFF_OW = discord.PermissionOverwrite(
+    view_channel=True, send_messages=True, read_message_history=True, manage_messages=True, attach_files=True
+)
+
 # Minimal intents for this ticket system
 intents = discord.Intents.default()
 intents.message_content = False
 intents.members = True
 
 bot = commands.Bot(command_prefix="!", intents=intents)
+# guild id -> ticket category channel id
+bot._ticket_category_cache: dict[int, int] = {}  # type: ignore[attr-defined]
+# guild id -> resolved staff role (filled in on_ready, only successful lookups)
+bot._staff_role_by_guild: dict[int, discord.Role] = {}  # type: ignore[attr-defined]
+# The one TicketPanel shared by every ticket (View needs a running loop, so built in on_ready)
+bot._ticket_panel = None  # type: ignore[attr-defined]
+
+# Caps concurrent slow handlers (transcripts, ticket creation)
+_HEAVY_SEM = asyncio.Semaphore(4)
+
+# Strong references to fire-and-forget tasks (the event loop only keeps weak ones)
+_background_tasks: set[asyncio.Task] = set()
+# Channel ids with a scheduled delete, so repeated closes don't stack up
+_pending_deletes: set[int] = set()
+# Per-channel locks for overwrite edits (bulk edits read-modify-write the whole map)
+_overwrite_locks: dict[int, asyncio.Lock] = {}
 
 
 # ---------- Helpers ----------
 
+_SAFE_NAME_TABLE = str.maketrans({" ": "-", "\t": "-", "_": "-"})
+
 def fmt_ts(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
 
+def cached_category(guild: discord.Guild, name: str) -> discord.CategoryChannel | None:
+    """Cache-only lookup; never touches the API."""
+    cat = guild.get_channel(bot._ticket_category_cache.get(guild.id, 0))  # type: ignore[attr-defined]
+    if isinstance(cat, discord.CategoryChannel) and cat.name == name:
+        return cat
+    return None
+
 async def get_or_create_category(guild: discord.Guild, name: str) -> discord.CategoryChannel:
+    """Slow path for a cached_category miss: scan by name or create, then cache."""
     cat = discord.utils.get(guild.categories, name=name)
     if cat is None:
         cat = await guild.create_category(name=name, reason="Create ticket category")
+    bot._ticket_category_cache[guild.id] = cat.id  # type: ignore[attr-defined]
     return cat
 
+def staff_role_for(guild: discord.Guild) -> discord.Role | None:
+    if _STAFF_ROLE_ID is None:
+        return None
+    cache: dict[int, discord.Role] = bot._staff_role_by_guild  # type: ignore[attr-defined]
+    role = cache.get(guild.id)
+    if role is None:
+        # Misses are not cached: the role may simply not be loaded yet
+        role = guild.get_role(_STAFF_ROLE_ID)
+        if role is not None:
+            cache[guild.id] = role
+    return role
+
+async def _deferred_delete(interaction: discord.Interaction, reason: str, delay: float = 5):
+    channel_id = interaction.channel.id  # type: ignore
+    error: str | None = None
+    try:
+        await asyncio.sleep(delay)
+        await interaction.channel.delete(reason=reason)  # type: ignore
+    except discord.NotFound:
+        pass  # already deleted
+    except discord.Forbidden:
+        error = "I lack permission to delete this channel."
+    except discord.HTTPException:
+        error = "Failed to delete this channel."
+    finally:
+        _pending_deletes.discard(channel_id)
+
+    if error is not None:
+        # Nothing awaits this task, so a failed report must not escape it
+        try:
+            await interaction.followup.send(error, ephemeral=True)
+        except discord.HTTPException as e:
+            print("Could not report failed channel delete:", e)
+
+def schedule_delete(interaction: discord.Interaction, reason: str) -> bool:
+    """Delete the channel in the background so the handler returns immediately.
+
+    Returns False if a delete is already pending for this channel.
+    """
+    channel_id = interaction.channel.id  # type: ignore
+    if channel_id in _pending_deletes:
+        return False
+    _pending_deletes.add(channel_id)
+    task = asyncio.create_task(_deferred_delete(interaction, reason))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return True
+
 def build_ticket_overwrites(
     guild: discord.Guild,
     opener: discord.Member,
     staff_role: discord.Role | None
 ) -> dict[discord.abc.Snowflake, discord.PermissionOverwrite]:
-    overwrites = {
-        guild.default_role: discord.PermissionOverwrite(view_channel=False),
-        opener: discord.PermissionOverwrite(
-            view_channel=True, send_messages=True, read_message_history=True, attach_files=True
-        ),
-        guild.me: discord.PermissionOverwrite(
-            view_channel=True, send_messages=True, manage_channels=True, read_message_history=True, attach_files=True
-        ),
+    return {
+        guild.default_role: _DENY_VIEW,
+        opener: _OPENER_OW,
+        guild.me: _BOT_OW,
+        **({staff_role: _STAFF_OW} if staff_role else {}),
     }
-    if staff_role:
-        overwrites[staff_role] = discord.PermissionOverwrite(
-            view_channel=True, send_messages=True, read_message_history=True, manage_messages=True, attach_files=True
-        )
-    return overwrites
+
+async def _apply_overwrites(
+    channel: discord.TextChannel,
+    changes: dict[discord.Member, discord.PermissionOverwrite | None],
+    reason: str | None = None,
+):
+    """Apply several member overwrites in a single channel edit (None removes).
+
+    All edits on a channel are serialized. A single target goes through
+    set_permissions, which only touches that target. Bulk edits rewrite the
+    whole map, built from a freshly fetched channel: edit() does not update the
+    cached object, so its overwrites can lag until the gateway update arrives.
+    """
+    async with _overwrite_locks.setdefault(channel.id, asyncio.Lock()):
+        if len(changes) == 1:
+            target, overwrite = next(iter(changes.items()))
+            await channel.set_permissions(target, overwrite=overwrite, reason=reason)
+            return
+
+        fresh = await channel.guild.fetch_channel(channel.id)
+        new_map = dict(fresh.overwrites)  # type: ignore[union-attr]
+        for target, overwrite in changes.items():
+            if overwrite is None:
+                new_map.pop(target, None)
+            else:
+                new_map[target] = overwrite
+        await channel.edit(overwrites=new_map, reason=reason)
+
+def split_members(
+    guild: discord.Guild | None,
+    users: list[discord.Member | discord.User],
+) -> tuple[list[discord.Member], list[discord.Member | discord.User]]:
+    """Split selected users into guild Members and those not in the server."""
+    members: list[discord.Member] = []
+    missing: list[discord.Member | discord.User] = []
+    for u in users:
+        m = guild.get_member(u.id) if guild else None
+        if m is None:
+            missing.append(u)
+        else:
+            members.append(m)
+    return members, missing
+
+def skipped_note(missing: list[discord.Member | discord.User]) -> str:
+    if not missing:
+        return ""
+    return "\nSkipped (not in this server): " + ", ".join(u.mention for u in missing)
+
+def topic_opener_id(channel: discord.abc.GuildChannel | discord.Thread | None) -> int:
+    """Opener id stored in the ticket topic as `opener:<id>` (0 if missing)."""
+    topic = getattr(channel, "topic", None) or ""
+    head = topic.split(" | ", 1)[0]
+    if head.startswith("opener:") and head[7:].isdigit():
+        return int(head[7:])
+    return 0
+
+def is_staff(member: discord.Member) -> bool:
+    return _STAFF_ROLE_ID is not None and member.get_role(_STAFF_ROLE_ID) is not None
 
 def can_manage(interaction: discord.Interaction, opener_id: int) -> bool:
     """User may manage if opener or has staff role."""
     member: discord.Member = interaction.user  # type: ignore
-    if member.id == opener_id:
-        return True
-    if STAFF_ROLE_ID and any(r.id == int(STAFF_ROLE_ID) for r in member.roles):  # type: ignore
-        return True
-    return False
+    return member.id == opener_id or is_staff(member)
 
 
 # ---------- UI Components ----------
@@ -89,9 +233,9 @@ class AddUserView(discord.ui.View):
         self.opener_id = opener_id
 
         self.user_select = discord.ui.UserSelect(
-            placeholder="Select a user to add",
+            placeholder="Select users to add",
             min_values=1,
-            max_values=1,
+            max_values=25,
             custom_id="ticket:add_user_select",
         )
         self.user_select.callback = self.select_user  # type: ignore
@@ -101,21 +245,20 @@ class AddUserView(discord.ui.View):
         if not can_manage(interaction, self.opener_id):
             return await interaction.response.send_message("You are not allowed to manage this ticket.", ephemeral=True)
 
-        if not isinstance(interaction.channel, (discord.TextChannel, discord.Thread)):
+        if not isinstance(interaction.channel, discord.TextChannel):
             return await interaction.response.send_message("Invalid channel.", ephemeral=True)
 
-        selected = self.user_select.values[0]
-        # Ensure we have a Member for permission overwrites
-        target_member = interaction.guild.get_member(selected.id) if interaction.guild else None
-        if target_member is None:
+        # Ensure we have Members for permission overwrites
+        targets, missing = split_members(interaction.guild, self.user_select.values)
+        if not targets:
             return await interaction.response.send_message("User is not in this server.", ephemeral=True)
 
         try:
-            await interaction.channel.set_permissions(
-                target_member,
-                view_channel=True, send_messages=True, read_message_history=True, attach_files=True
+            await _apply_overwrites(interaction.channel, dict.fromkeys(targets, _OPENER_OW), reason="ticket add user")
+            mentions = ", ".join(m.mention for m in targets)
+            await interaction.response.send_message(
+                f"Added {mentions} to this ticket." + skipped_note(missing), ephemeral=True
             )
-            await interaction.response.send_message(f"Added {target_member.mention} to this ticket.", ephemeral=True)
         except discord.Forbidden:
             await interaction.response.send_message("Missing permission to modify channel permissions.", ephemeral=True)
 
@@ -127,9 +270,9 @@ class RemoveUserView(discord.ui.View):
         self.opener_id = opener_id
 
         self.user_select = discord.ui.UserSelect(
-            placeholder="Select a user to remove",
+            placeholder="Select users to remove",
             min_values=1,
-            max_values=1,
+            max_values=25,
             custom_id="ticket:remove_user_select",
         )
         self.user_select.callback = self.select_user  # type: ignore
@@ -139,89 +282,122 @@ class RemoveUserView(discord.ui.View):
         if not can_manage(interaction, self.opener_id):
             return await interaction.response.send_message("You are not allowed to manage this ticket.", ephemeral=True)
 
-        if not isinstance(interaction.channel, (discord.TextChannel, discord.Thread)):
+        if not isinstance(interaction.channel, discord.TextChannel):
             return await interaction.response.send_message("Invalid channel.", ephemeral=True)
 
-        selected = self.user_select.values[0]
-        target_member = interaction.guild.get_member(selected.id) if interaction.guild else None
-        if target_member is None:
+        targets, missing = split_members(interaction.guild, self.user_select.values)
+        if not targets:
             return await interaction.response.send_message("User is not in this server.", ephemeral=True)
 
         try:
-            await interaction.channel.set_permissions(target_member, overwrite=None)
-            await interaction.response.send_message(f"Removed {target_member.mention} from this ticket.", ephemeral=True)
+            await _apply_overwrites(interaction.channel, dict.fromkeys(targets), reason="ticket remove user")
+            mentions = ", ".join(m.mention for m in targets)
+            await interaction.response.send_message(
+                f"Removed {mentions} from this ticket." + skipped_note(missing), ephemeral=True
+            )
         except discord.Forbidden:
             await interaction.response.send_message("Missing permission to modify channel permissions.", ephemeral=True)
 
 
 class TicketPanel(discord.ui.View):
-    def __init__(self, opener_id: int):
+    """Single persistent view shared by all tickets; opener is read from the channel topic."""
+    def __init__(self):
         super().__init__(timeout=None)  # persistent
-        self.opener_id = opener_id
 
     @discord.ui.button(label="Close", style=discord.ButtonStyle.danger, custom_id="ticket:close")
     async def close(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not can_manage(interaction, self.opener_id):
+        if not can_manage(interaction, topic_opener_id(interaction.channel)):
             return await interaction.response.send_message("You are not allowed to close this ticket.", ephemeral=True)
+        if isinstance(interaction.channel, discord.TextChannel) and not schedule_delete(interaction, "Ticket closed"):
+            return await interaction.response.send_message("This ticket is already closing.", ephemeral=True)
         await interaction.response.send_message("Closing in 5 seconds…", ephemeral=True)
-        await asyncio.sleep(5)
-        if isinstance(interaction.channel, discord.TextChannel):
-            try:
-                await interaction.channel.delete(reason="Ticket closed")
-            except discord.Forbidden:
-                await interaction.followup.send("I lack permission to delete this channel.", ephemeral=True)
 
     @discord.ui.button(label="Transcript", style=discord.ButtonStyle.secondary, custom_id="ticket:transcript")
     async def transcript(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not can_manage(interaction, self.opener_id):
+        if not can_manage(interaction, topic_opener_id(interaction.channel)):
             return await interaction.response.send_message("You are not allowed to get a transcript.", ephemeral=True)
 
         if not isinstance(interaction.channel, discord.TextChannel):
             return await interaction.response.send_message("Invalid channel.", ephemeral=True)
 
+        # Nothing was ever posted here, skip the history requests entirely
+        if interaction.channel.last_message_id is None:
+            return await interaction.response.send_message("No messages.", ephemeral=True)
+
         await interaction.response.defer(ephemeral=True, thinking=True)
 
-        lines: list[str] = []
-        async for msg in interaction.channel.history(limit=None, oldest_first=True):
-            author = f"{msg.author} ({msg.author.id})"
-            time_str = fmt_ts(msg.created_at)
-            content = msg.content.replace("\n", "\\n")
-            attach_info = ""
-            if msg.attachments:
-                attach_info = " | Attachments: " + ", ".join(att.url for att in msg.attachments)
-            lines.append(f"[{time_str}] {author}: {content}{attach_info}")
-
-        buf = io.StringIO("\n".join(lines) if lines else "No messages.")
-        filename = f"transcript-{interaction.channel.name}.txt"
-        file = discord.File(fp=io.BytesIO(buf.getvalue().encode("utf-8")), filename=filename)
+        async with _HEAVY_SEM:
+            buf = bytearray()
+            # Page explicitly with an `after` cursor so every request makes forward progress
+            after: discord.abc.Snowflake | None = None
+            while True:
+                batch = [
+                    m async for m in interaction.channel.history(limit=HISTORY_PAGE_SIZE, after=after, oldest_first=True)
+                ]
+                if not batch:
+                    break
+                after = batch[-1]
+                for msg in batch:
+                    author = f"{msg.author} ({msg.author.id})"
+                    # created_at is already UTC-aware, no tz conversion needed
+                    time_str = msg.created_at.strftime("%Y-%m-%d %H:%M:%S UTC")
+                    content = msg.content.replace("\n", "\\n")
+                    buf.extend(f"[{time_str}] {author}: {content}".encode("utf-8"))
+                    if msg.attachments:
+                        buf.extend(b" | Attachments: ")
+                        first = True
+                        for att in msg.attachments:
+                            if not first:
+                                buf.extend(b", ")
+                            buf.extend(att.url.encode("utf-8"))
+                            first = False
+                    buf.extend(b"\n")
+                if len(batch) < HISTORY_PAGE_SIZE:
+                    break
+
+            if not buf:
+                buf.extend(b"No messages.")
 
+        filename = f"transcript-{interaction.channel.name}.txt"
+        # bytes() makes the one copy; BytesIO shares immutable bytes, so drop the bytearray before uploading
+        data = bytes(buf)
+        del buf
+        file = discord.File(fp=io.BytesIO(data), filename=filename)
+        del data
         await interaction.followup.send(content="Here is the transcript.", file=file, ephemeral=True)
 
     @discord.ui.button(label="Add User", style=discord.ButtonStyle.primary, custom_id="ticket:add_user")
     async def add_user(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not can_manage(interaction, self.opener_id):
+        opener_id = topic_opener_id(interaction.channel)
+        if not can_manage(interaction, opener_id):
             return await interaction.response.send_message("You are not allowed to manage this ticket.", ephemeral=True)
-        await interaction.response.send_message("Select a user to add:", view=AddUserView(self.opener_id), ephemeral=True)
+        await interaction.response.send_message("Select users to add (up to 25):", view=AddUserView(opener_id), ephemeral=True)
 
     @discord.ui.button(label="Remove User", style=discord.ButtonStyle.secondary, custom_id="ticket:remove_user")
     async def remove_user(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not can_manage(interaction, self.opener_id):
+        opener_id = topic_opener_id(interaction.channel)
+        if not can_manage(interaction, opener_id):
             return await interaction.response.send_message("You are not allowed to manage this ticket.", ephemeral=True)
-        await interaction.response.send_message("Select a user to remove:", view=RemoveUserView(self.opener_id), ephemeral=True)
+        await interaction.response.send_message("Select users to remove (up to 25):", view=RemoveUserView(opener_id), ephemeral=True)
 
     @discord.ui.button(label="Claim", style=discord.ButtonStyle.success, custom_id="ticket:claim")
     async def claim(self, interaction: discord.Interaction, button: discord.ui.Button):
         member: discord.Member = interaction.user  # type: ignore
-        if not STAFF_ROLE_ID or not any(r.id == int(STAFF_ROLE_ID) for r in member.roles):  # type: ignore
+        if not is_staff(member):
             return await interaction.response.send_message("Only staff can claim tickets.", ephemeral=True)
 
         if isinstance(interaction.channel, discord.TextChannel):
             topic = interaction.channel.topic or ""
             claimed_note = f"Claimed by {member} at {fmt_ts(datetime.now(timezone.utc))}"
-            try:
-                await interaction.channel.edit(topic=f"{topic} | {claimed_note}"[:1024])
-            except discord.Forbidden:
-                pass
+            new_topic = f"{topic} | {claimed_note}" if topic else claimed_note
+            if len(new_topic) > 1024:
+                # Keep the `opener:<id>` marker, drop earlier claim notes
+                new_topic = f"{topic.split(' | ', 1)[0]} | {claimed_note}"[:1024]
+            if new_topic != topic:
+                try:
+                    await interaction.channel.edit(topic=new_topic, reason="ticket claim")
+                except discord.Forbidden:
+                    pass
             await interaction.response.send_message(f"Ticket claimed by {member.mention}.", ephemeral=False)
         else:
             await interaction.response.send_message("Invalid channel.", ephemeral=True)
@@ -239,7 +415,7 @@ class TicketOpenView(discord.ui.View):
         self.reason_select = discord.ui.Select(
             placeholder="Select a reason…",
             min_values=1, max_values=1,
-            options=[discord.SelectOption(label=r) for r in PRESET_REASONS],
+            options=list(_REASON_OPTIONS),
             custom_id="ticket:select_reason",
         )
         self.reason_select.callback = self.on_reason  # type: ignore
@@ -249,7 +425,7 @@ class TicketOpenView(discord.ui.View):
         self.priority_select = discord.ui.Select(
             placeholder="Select priority…",
             min_values=1, max_values=1,
-            options=[discord.SelectOption(label=p) for p in PRESET_PRIORITIES],
+            options=list(_PRIORITY_OPTIONS),
             custom_id="ticket:select_priority",
         )
         self.priority_select.callback = self.on_priority  # type: ignore
@@ -275,14 +451,12 @@ class TicketOpenView(discord.ui.View):
         self.add_item(self.cancel_btn)
 
     def _summary_text(self) -> str:
-        r = self.reason or "—"
-        p = self.priority or "—"
-        return f"**Reason:** {r}\n**Priority:** {p}"
+        return f"**Reason:** {self.reason or _UNSET_LABEL}\n**Priority:** {self.priority or _UNSET_LABEL}"
 
     async def _refresh(self, interaction: discord.Interaction):
         self.confirm_btn.disabled = not (self.reason and self.priority)
         await interaction.response.edit_message(
-            content="Please choose a reason and a priority, then press **Create Ticket**.\n\n" + self._summary_text(),
+            content=_PROMPT_PREFIX + self._summary_text(),
             view=self
         )
 
@@ -301,39 +475,60 @@ class TicketOpenView(discord.ui.View):
         if not (self.reason and self.priority):
             return await interaction.response.send_message("Please select both fields first.", ephemeral=True)
 
+        await interaction.response.defer()
         assert interaction.guild is not None
         guild = interaction.guild
-        staff_role = guild.get_role(int(STAFF_ROLE_ID)) if STAFF_ROLE_ID else None
-        category = await get_or_create_category(guild, TICKET_CATEGORY_NAME)
-
-        safe_name = self.opener.name.lower().replace(" ", "-")
-        channel_name = f"ticket-{safe_name}-{self.opener.discriminator if self.opener.discriminator != '0' else self.opener.id}"
-
-        overwrites = build_ticket_overwrites(guild, self.opener, staff_role)
-        channel = await guild.create_text_channel(
-            name=channel_name,
-            category=category,
-            overwrites=overwrites,
-            reason=f"Ticket opened by {self.opener} ({self.opener.id})",
-        )
-
-        embed = discord.Embed(
-            title="🎫 Ticket Created",
-            description=(
-                f"Hello {self.opener.mention}! A staff member will assist you shortly.\n\n"
-                f"**Reason:** {self.reason}\n"
-                f"**Priority:** {self.priority}\n\n"
-                "Use the buttons below to manage this ticket."
-            ),
-            color=discord.Color.blurple(),
-            timestamp=datetime.now(timezone.utc),
-        )
-        embed.set_footer(text=f"Opened by {self.opener} • ID {self.opener.id}")
+        error: str | None = None
+        async with _HEAVY_SEM:
+            staff_role = staff_role_for(guild)
 
-        view = TicketPanel(opener_id=self.opener.id)
-        await channel.send(content=(staff_role.mention if staff_role else ""), embed=embed, view=view)
+            safe_name = self.opener.name.lower().translate(_SAFE_NAME_TABLE)
+            disc = self.opener.discriminator
+            suffix = disc if disc != "0" else str(self.opener.id)
+            channel_name = "ticket-" + safe_name + "-" + suffix
 
-        await interaction.response.edit_message(
+            overwrites = build_ticket_overwrites(guild, self.opener, staff_role)
+            try:
+                # Both lookups are local cache hits in steady state; only creating the channel hits the API
+                category = cached_category(guild, TICKET_CATEGORY_NAME) or await get_or_create_category(
+                    guild, TICKET_CATEGORY_NAME
+                )
+                channel = await guild.create_text_channel(
+                    name=channel_name,
+                    category=category,
+                    overwrites=overwrites,
+                    topic=f"opener:{self.opener.id}",
+                    reason=f"Ticket opened by {self.opener} ({self.opener.id})",
+                )
+            except discord.HTTPException:
+                error = "Could not create the ticket (missing permissions or a Discord error). Please try again later."
+            else:
+                embed = discord.Embed(
+                    title="🎫 Ticket Created",
+                    description=(
+                        f"Hello {self.opener.mention}! A staff member will assist you shortly.\n\n"
+                        f"**Reason:** {self.reason}\n"
+                        f"**Priority:** {self.priority}\n\n"
+                        "Use the buttons below to manage this ticket."
+                    ),
+                    color=discord.Color.blurple(),
+                    timestamp=datetime.now(timezone.utc),
+                )
+                embed.set_footer(text=f"Opened by {self.opener} • ID {self.opener.id}")
+
+                try:
+                    await channel.send(content=(staff_role.mention if staff_role else ""), embed=embed, view=bot._ticket_panel)  # type: ignore[attr-defined]
+                except discord.HTTPException:
+                    # The channel exists; say so instead of inviting a duplicate ticket
+                    error = (
+                        f"Your ticket has been created: {channel.mention}, "
+                        "but the ticket panel could not be posted there. Staff can still close it with /close."
+                    )
+
+        if error is not None:
+            return await interaction.edit_original_response(content=error, view=None)
+
+        await interaction.edit_original_response(
             content=f"Your ticket has been created: {channel.mention}",
             view=None
         )
@@ -343,8 +538,13 @@ class TicketOpenView(discord.ui.View):
 
 @bot.event
 async def on_ready():
-    # Register persistent view so buttons survive restarts
-    bot.add_view(TicketPanel(opener_id=0))
+    # Register persistent view so buttons survive restarts (on_ready can fire again on reconnect)
+    if bot._ticket_panel is None:  # type: ignore[attr-defined]
+        bot._ticket_panel = TicketPanel()  # type: ignore[attr-defined]
+        bot.add_view(bot._ticket_panel)  # type: ignore[attr-defined]
+    if _STAFF_ROLE_ID is not None:
+        for g in bot.guilds:
+            staff_role_for(g)
     print(f"Logged in as {bot.user} (ID: {bot.user.id})")
 
     # Sync slash commands (guild-scoped is faster)
@@ -361,13 +561,33 @@ async def on_ready():
         print("Command sync failed:", e)
 
 
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    cache: dict[int, int] = bot._ticket_category_cache  # type: ignore[attr-defined]
+    if cache.get(channel.guild.id) == channel.id:
+        del cache[channel.guild.id]
+    _overwrite_locks.pop(channel.id, None)
+
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    if after.id == _STAFF_ROLE_ID:
+        bot._staff_role_by_guild[after.guild.id] = after  # type: ignore[attr-defined]
+
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    if role.id == _STAFF_ROLE_ID:
+        bot._staff_role_by_guild.pop(role.guild.id, None)  # type: ignore[attr-defined]
+
+
 @bot.tree.command(name="ticket", description="Open a new support ticket")
 async def ticket(interaction: discord.Interaction):
     assert interaction.guild is not None, "Command must be used in a server"
     opener: discord.Member = interaction.user  # type: ignore
     view = TicketOpenView(opener)
     await interaction.response.send_message(
-        content="Please choose a reason and a priority, then press **Create Ticket**.\n\n" + view._summary_text(),
+        content=_PROMPT_PREFIX + view._summary_text(),
         view=view,
         ephemeral=True
     )
@@ -379,15 +599,12 @@ async def close(interaction: discord.Interaction):
         return await interaction.response.send_message("Use this inside a ticket channel.", ephemeral=True)
 
     member: discord.Member = interaction.user  # type: ignore
-    if not (STAFF_ROLE_ID and any(r.id == int(STAFF_ROLE_ID) for r in member.roles)):  # type: ignore
+    if not is_staff(member):
         return await interaction.response.send_message("Only staff can use this command.", ephemeral=True)
 
+    if not schedule_delete(interaction, f"Closed by {interaction.user}"):
+        return await interaction.response.send_message("This ticket is already closing.", ephemeral=True)
     await interaction.response.send_message("Closing in 5 seconds…", ephemeral=True)
-    await asyncio.sleep(5)
-    try:
-        await interaction.channel.delete(reason=f"Closed by {interaction.user}")
-    except discord.Forbidden:
-        await interaction.followup.send("I lack permission to delete this channel.", ephemeral=True)
 
 
 if __name__ == "__main__":